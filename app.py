@@ -1,348 +1,448 @@
-import streamlit as st
-import pandas as pd
-import plotly.express as px
-import json
-from utils import collection, get_chat_response
-
-# --- CONFIGURATION ---
-st.set_page_config(page_title="Expense Tracker", page_icon="💰", layout="wide")
-CURRENCY = "₹" 
-
-# --- CSS ---
-st.markdown("""
-<style>
-    .metric-card {
-        background-color: #262730;
-        border: 1px solid #41424C;
-        padding: 15px;
-        border-radius: 10px;
-        color: white;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-st.title("💰 My Expenses")
-
-# --- LOAD DATA ---
-cursor = collection.find()
-data = list(cursor)
-
-if not data:
-    st.warning("No data found. Use your Telegram bot to add expenses!")
-else:
-    # Clean Data
-    df = pd.DataFrame(data)
-    df['_id'] = df['_id'].astype(str)
-    df['date'] = pd.to_datetime(df['date'])
-
-    # --- FILTERS ---
-    st.sidebar.header("Filters")
-    df['Month'] = df['date'].dt.strftime('%B')
-    df['Year'] = df['date'].dt.year
-    
-    unique_years = sorted(df['Year'].unique(), reverse=True)
-    selected_year = st.sidebar.selectbox("Year", unique_years, index=0)
-    df_year = df[df['Year'] == selected_year]
-    
-    available_months = df_year['Month'].unique()
-    selected_month = st.sidebar.selectbox("Month", ["All"] + list(available_months))
-    
-    if selected_month != "All":
-        df_filtered = df_year[df_year['Month'] == selected_month]
-    else:
-        df_filtered = df_year
-
-    # --- METRICS ---
-    total_spent = df_filtered['a'].sum()
-    avg_spent = df_filtered['a'].mean() if not df_filtered.empty else 0
-    
-    col1, col2, col3 = st.columns(3)
-    with col1: st.metric(label="Net Total", value=f"{CURRENCY}{total_spent:,.0f}")
-    with col2: st.metric(label="Transactions", value=len(df_filtered))
-    with col3: st.metric(label="Average / Txn", value=f"{CURRENCY}{avg_spent:,.0f}")
-
-    st.divider()
-
-    # --- CHARTS ---
-    col_chart1, col_chart2 = st.columns(2)
-    
-    with col_chart1:
-        st.subheader("Spending by Category")
-        if not df_filtered.empty:
-            fig_pie = px.pie(df_filtered, values='a', names='c', hole=0.5, color_discrete_sequence=px.colors.qualitative.Pastel)
-            st.plotly_chart(fig_pie, use_container_width=True, key="pie_chart")
-
-    with col_chart2:
-        st.subheader("Spending Over Time")
-        if not df_filtered.empty:
-            daily_trend = df_filtered.groupby(df_filtered['date'].dt.date)['a'].sum().reset_index()
-            fig_bar = px.bar(daily_trend, x='date', y='a', color='a', color_continuous_scale="Viridis")
-            st.plotly_chart(fig_bar, use_container_width=True, key="trend_bar")
-
-    # --- RECENT TRANSACTIONS ---
-    st.divider()
-    st.subheader("📝 Recent Transactions")
-    
-    recent_tx = df_filtered.sort_values(by="date", ascending=False).head(10)
-    
-    for index, row in recent_tx.iterrows():
-        with st.container():
-            c1, c2, c3 = st.columns([1, 3, 1])
-            
-            c1.write(f"**{row['date'].strftime('%d %b')}**")
-            
-            item = row.get('i', 'Unknown')
-            category = row.get('c', 'General')
-            note = row.get('n', "")
-            
-            c2.write(f"{item} ({category})")
-            if note: c2.caption(f"📌 {note}")
-            
-            amount = row.get('a', 0)
-            if amount < 0:
-                c3.markdown(f"<span style='color:#00FF00'>+ {CURRENCY}{abs(amount)}</span>", unsafe_allow_html=True)
-            else:
-                c3.write(f"{CURRENCY}{amount}")
-            st.markdown("---")
-
-    # --- AI CHAT ---
-    with st.expander("🤖 Ask AI about your spending"):
-        user_query = st.text_input("Ask a question...")
-        if user_query:
-            with st.spinner("Thinking..."):
-                # Clean data for AI (Convert Timestamp to String)
-                ai_data = df_filtered.copy()
-                ai_data['date'] = ai_data['date'].dt.strftime('%Y-%m-%d')
-                data_str = ai_data.to_json(orient="records")
-                
-                answer = get_chat_response(user_query, data_str)
-                st.markdown(answer)
-
-# import streamlit as st
-# import pandas as pd
-# import plotly.express as px
-# from utils import collection, get_chat_response
-
-# st.set_page_config(page_title="Expense Tracker", page_icon="💰", layout="wide")
-# CURRENCY = "₹" 
-
-# # CSS
-# st.markdown("""
-# <style>
-#     .metric-card {
-#         background-color: #262730;
-#         border: 1px solid #41424C;
-#         padding: 15px;
-#         border-radius: 10px;
-#         color: white;
-#     }
-# </style>
-# """, unsafe_allow_html=True)
-
-# st.title("💰 My Expenses")
-
-# cursor = collection.find()
-# data = list(cursor)
-
-# if not data:
-#     st.warning("No data found. Use your Telegram bot to add expenses!")
-# else:
-#     df = pd.DataFrame(data)
-#     df['_id'] = df['_id'].astype(str)
-#     df['date'] = pd.to_datetime(df['date'])
-
-#     st.sidebar.header("Filters")
-#     df['Month'] = df['date'].dt.strftime('%B')
-#     df['Year'] = df['date'].dt.year
-    
-#     unique_years = sorted(df['Year'].unique(), reverse=True)
-#     selected_year = st.sidebar.selectbox("Year", unique_years, index=0)
-#     df_year = df[df['Year'] == selected_year]
-    
-#     available_months = df_year['Month'].unique()
-#     selected_month = st.sidebar.selectbox("Month", ["All"] + list(available_months))
-    
-#     if selected_month != "All":
-#         df_filtered = df_year[df_year['Month'] == selected_month]
-#     else:
-#         df_filtered = df_year
-
-#     total_spent = df_filtered['a'].sum()
-#     avg_spent = df_filtered['a'].mean() if not df_filtered.empty else 0
-    
-#     col1, col2, col3 = st.columns(3)
-#     with col1: st.metric(label="Net Total", value=f"{CURRENCY}{total_spent:,.0f}")
-#     with col2: st.metric(label="Transactions", value=len(df_filtered))
-#     with col3: st.metric(label="Average / Txn", value=f"{CURRENCY}{avg_spent:,.0f}")
-
-#     st.divider()
-
-#     col_chart1, col_chart2 = st.columns(2)
-    
-#     with col_chart1:
-#         st.subheader("Spending by Category")
-#         if not df_filtered.empty:
-#             fig_pie = px.pie(df_filtered, values='a', names='c', hole=0.5, color_discrete_sequence=px.colors.qualitative.Pastel)
-#             st.plotly_chart(fig_pie, width="stretch", key="pie_chart")
-
-#     with col_chart2:
-#         st.subheader("Spending Over Time")
-#         if not df_filtered.empty:
-#             daily_trend = df_filtered.groupby(df_filtered['date'].dt.date)['a'].sum().reset_index()
-#             fig_bar = px.bar(daily_trend, x='date', y='a', color='a', color_continuous_scale="Viridis")
-#             st.plotly_chart(fig_bar, width="stretch", key="trend_bar")
-
-#     st.divider()
-#     st.subheader("📝 Recent Transactions")
-    
-#     recent_tx = df_filtered.sort_values(by="date", ascending=False).head(10)
-    
-#     for index, row in recent_tx.iterrows():
-#         with st.container():
-#             c1, c2, c3 = st.columns([1, 3, 1])
-#             c1.write(f"**{row['date'].strftime('%d %b')}**")
-            
-#             item = row.get('i', 'Unknown')
-#             category = row.get('c', 'General')
-#             note = row.get('n', "")
-            
-#             c2.write(f"{item} ({category})")
-#             if note: c2.caption(f"📌 {note}")
-            
-#             amount = row.get('a', 0)
-#             if amount < 0:
-#                 c3.markdown(f"<span style='color:#00FF00'>+ {CURRENCY}{abs(amount)}</span>", unsafe_allow_html=True)
-#             else:
-#                 c3.write(f"{CURRENCY}{amount}")
-#             st.markdown("---")
-
-#     with st.expander("🤖 Ask AI about your spending"):
-#         user_query = st.text_input("Ask a question...")
-#         if user_query:
-#             with st.spinner("Thinking..."):
-#                 # We fetch fresh data for the AI analysis
-#                 cursor = collection.find({}, {"_id": 0})
-#                 data_list = list(cursor)
-#                 answer = get_chat_response(user_query, data_list)
-#                 st.info(answer)
-
-# import streamlit as st
-# import pandas as pd
-# import plotly.express as px
-# from utils import collection, get_chat_response
-
-# # --- CONFIGURATION ---
-# st.set_page_config(page_title="Expense Tracker", page_icon="💰", layout="wide")
-# CURRENCY = "₹" 
-
-# # --- DARK MODE CSS ---
-# st.markdown("""
-# <style>
-#     .metric-card {
-#         background-color: #262730;
-#         border: 1px solid #41424C;
-#         padding: 15px;
-#         border-radius: 10px;
-#         color: white;
-#     }
-# </style>
-# """, unsafe_allow_html=True)
-
-# st.title("💰 My Expenses")
-
-# # --- LOAD DATA ---
-# cursor = collection.find()
-# data = list(cursor)
-
-# if not data:
-#     st.warning("No data found. Use your Telegram bot to add expenses!")
-# else:
-#     # Clean Data
-#     df = pd.DataFrame(data)
-#     df['_id'] = df['_id'].astype(str)
-#     df['date'] = pd.to_datetime(df['date'])
-
-#     # --- FILTERS ---
-#     st.sidebar.header("Filters")
-#     df['Month'] = df['date'].dt.strftime('%B')
-#     df['Year'] = df['date'].dt.year
-    
-#     unique_years = sorted(df['Year'].unique(), reverse=True)
-#     selected_year = st.sidebar.selectbox("Year", unique_years, index=0)
-#     df_year = df[df['Year'] == selected_year]
-    
-#     available_months = df_year['Month'].unique()
-#     selected_month = st.sidebar.selectbox("Month", ["All"] + list(available_months))
-    
-#     if selected_month != "All":
-#         df_filtered = df_year[df_year['Month'] == selected_month]
-#     else:
-#         df_filtered = df_year
-
-#     # --- METRICS ---
-#     total_spent = df_filtered['a'].sum()
-#     avg_spent = df_filtered['a'].mean() if not df_filtered.empty else 0
-    
-#     col1, col2, col3 = st.columns(3)
-#     with col1: st.metric(label="Net Total", value=f"{CURRENCY}{total_spent:,.0f}")
-#     with col2: st.metric(label="Transactions", value=len(df_filtered))
-#     with col3: st.metric(label="Average / Txn", value=f"{CURRENCY}{avg_spent:,.0f}")
-
-#     st.divider()
-
-#     # --- CHARTS ---
-#     col_chart1, col_chart2 = st.columns(2)
-    
-#     with col_chart1:
-#         st.subheader("Spending by Category")
-#         if not df_filtered.empty:
-#             fig_pie = px.pie(df_filtered, values='a', names='c', hole=0.5, color_discrete_sequence=px.colors.qualitative.Pastel)
-#             st.plotly_chart(fig_pie, width="stretch", key="pie_chart")
-
-#     with col_chart2:
-#         st.subheader("Spending Over Time")
-#         if not df_filtered.empty:
-#             daily_trend = df_filtered.groupby(df_filtered['date'].dt.date)['a'].sum().reset_index()
-#             fig_bar = px.bar(daily_trend, x='date', y='a', color='a', color_continuous_scale="Viridis")
-#             st.plotly_chart(fig_bar, width="stretch", key="trend_bar")
-
-#     # --- RECENT TRANSACTIONS LIST ---
-#     st.divider()
-#     st.subheader("📝 Recent Transactions")
-    
-#     recent_tx = df_filtered.sort_values(by="date", ascending=False).head(10)
-    
-#     for index, row in recent_tx.iterrows():
-#         with st.container():
-#             c1, c2, c3 = st.columns([1, 3, 1])
-            
-#             # Date
-#             c1.write(f"**{row['date'].strftime('%d %b')}**")
-            
-#             # Item + Note
-#             item = row.get('i', 'Unknown')
-#             category = row.get('c', 'General')
-#             note = row.get('n', "")
-            
-#             c2.write(f"{item} ({category})")
-#             if note: c2.caption(f"📌 {note}")
-            
-#             # Amount (Color Logic)
-#             amount = row.get('a', 0)
-#             if amount < 0:
-#                 c3.markdown(f"<span style='color:#00FF00'>+ {CURRENCY}{abs(amount)}</span>", unsafe_allow_html=True)
-#             else:
-#                 c3.write(f"{CURRENCY}{amount}")
-                
-#             st.markdown("---")
-
-#     # --- AI CHAT ---
-#     with st.expander("🤖 Ask AI about your spending"):
-#         user_query = st.text_input("Ask a question...")
-#         if user_query:
-#             with st.spinner("Thinking..."):
-#                 data_str = df_filtered.to_json(orient="records", date_format="iso")
-#                 answer = get_chat_response(user_query, data_str)
-
-#                 st.info(answer)
-
+import html
+import streamlit as st
+import pandas as pd
+import numpy as np
+from datetime import datetime
+from utils import get_collection, stream_chat_response, CHAT_FAILURE
+
+# First call connects + pre-warms; later reruns reuse the memoized client
+collection = get_collection()
+# plotly.express and json are imported lazily where used — they cost
+# cold-start time even when the DB is empty and no chart is drawn
+
+# --- CONFIGURATION ---
+st.set_page_config(page_title="Expense Tracker", page_icon="💰", layout="wide")
+CURRENCY = "₹"
+
+# Month lookup tables (1-indexed) — avoids per-row strftime on reruns
+_MONTH_NAMES = np.array(['', 'January', 'February', 'March', 'April', 'May', 'June',
+                         'July', 'August', 'September', 'October', 'November', 'December'])
+_MONTH_ABBR = np.array(['', 'Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+                        'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])
+
+# --- CSS ---
+st.markdown("""
+<style>
+    .metric-card {
+        background-color: #262730;
+        border: 1px solid #41424C;
+        padding: 15px;
+        border-radius: 10px;
+        color: white;
+    }
+</style>
+""", unsafe_allow_html=True)
+
+st.title("💰 My Expenses")
+
+# --- LOAD DATA (cached) ---
+@st.cache_data(ttl=60, show_spinner=False)
+def load_expenses(version):
+    # Stream the cursor straight into per-field columns (known schema)
+    # instead of materializing a list of dicts for pandas to re-infer.
+    dates, amounts, cats, items, notes = [], [], [], [], []
+    # Newest-first from the date index, so downstream "recent" slices are just head()
+    for doc in collection.find({}, {"_id": 0, "date": 1, "a": 1, "c": 1, "i": 1, "n": 1}).sort('date', -1):
+        dates.append(doc['date'])
+        amounts.append(doc.get('a', 0))
+        cats.append(doc.get('c', 'General'))
+        items.append(doc.get('i', 'Unknown'))
+        notes.append(doc.get('n', ''))
+    if not dates: return pd.DataFrame()
+    df = pd.DataFrame({
+        'date': pd.to_datetime(dates),
+        'a': np.asarray(amounts, dtype=np.float64),
+        # ~18 categories and heavily repeated item names: categorical codes
+        # (int8) beat per-row Python strings for memory and isin/groupby speed
+        'c': pd.Categorical(cats), 'i': pd.Categorical(items), 'n': notes
+    })
+    return df
+
+# --- SERVER-SIDE AGGREGATIONS (cached) ---
+@st.cache_data(ttl=60, show_spinner=False)
+def load_daily_trend(version, start, end):
+    pipeline = [
+        {'$match': {'date': {'$gte': start, '$lt': end}}},
+        {'$group': {'_id': {'$dateTrunc': {'date': '$date', 'unit': 'day'}},
+                    'a': {'$sum': '$a'}, 'n': {'$sum': 1}}},
+        {'$sort': {'_id': 1}}
+    ]
+    trend = pd.DataFrame(list(collection.aggregate(pipeline)))
+    return trend.rename(columns={'_id': 'date'})
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_category_totals(version, start, end):
+    pipeline = [
+        {'$match': {'date': {'$gte': start, '$lt': end}}},
+        {'$group': {'_id': '$c', 'a': {'$sum': '$a'}}}
+    ]
+    totals = pd.DataFrame(list(collection.aggregate(pipeline)))
+    return totals.rename(columns={'_id': 'c'})
+
+# --- CHART FIGURES (cached as dicts so reruns skip the Plotly build/serialize) ---
+@st.cache_data(ttl=60, show_spinner=False)
+def build_pie_fig(version, start, end):
+    import plotly.express as px
+    cat_totals = load_category_totals(version, start, end)
+    if cat_totals.empty: return None
+    fig = px.pie(cat_totals, values='a', names='c', hole=0.5, color_discrete_sequence=px.colors.qualitative.Pastel)
+    return fig.to_dict()
+
+@st.cache_data(ttl=60, show_spinner=False)
+def build_trend_fig(version, start, end):
+    import plotly.express as px
+    daily_trend = load_daily_trend(version, start, end)
+    if daily_trend.empty: return None
+    fig = px.bar(daily_trend, x='date', y='a', color='a', color_continuous_scale="Viridis")
+    return fig.to_dict()
+
+# Cheap probe so the cache invalidates when the bot writes a new expense
+version = (
+    collection.estimated_document_count(),
+    str(collection.find_one(sort=[('date', -1)], projection={'date': 1}))
+)
+df = load_expenses(version)
+
+if df.empty:
+    st.warning("No data found. Use your Telegram bot to add expenses!")
+else:
+    # --- FILTERS ---
+    st.sidebar.header("Filters")
+
+    unique_years = sorted(df['date'].dt.year.unique(), reverse=True)
+    selected_year = st.sidebar.selectbox("Year", unique_years, index=0)
+
+    year_start = datetime(int(selected_year), 1, 1)
+    year_end = datetime(int(selected_year) + 1, 1, 1)
+    year_mask = (df['date'] >= year_start) & (df['date'] < year_end)
+
+    month_nums = np.sort(df.loc[year_mask, 'date'].dt.month.unique())
+    available_months = list(_MONTH_NAMES[month_nums])
+    selected_month = st.sidebar.selectbox("Month", ["All"] + available_months)
+
+    if selected_month != "All":
+        month_num = datetime.strptime(selected_month, '%B').month
+        range_start = datetime(int(selected_year), month_num, 1)
+        range_end = year_end if month_num == 12 else datetime(int(selected_year), month_num + 1, 1)
+        # One vectorized range check on the datetime64 column, no string columns
+        df_filtered = df[(df['date'] >= range_start) & (df['date'] < range_end)]
+    else:
+        range_start, range_end = year_start, year_end
+        df_filtered = df[year_mask]
+
+    # Only per-day totals travel over the wire
+    daily_trend = load_daily_trend(version, range_start, range_end)
+
+    # --- METRICS ---
+    total_spent = daily_trend['a'].sum() if not daily_trend.empty else 0
+    tx_count = int(daily_trend['n'].sum()) if not daily_trend.empty else 0
+    avg_spent = total_spent / tx_count if tx_count else 0
+
+    col1, col2, col3 = st.columns(3)
+    with col1: st.metric(label="Net Total", value=f"{CURRENCY}{total_spent:,.0f}")
+    with col2: st.metric(label="Transactions", value=tx_count)
+    with col3: st.metric(label="Average / Txn", value=f"{CURRENCY}{avg_spent:,.0f}")
+
+    st.divider()
+
+    # --- CHARTS ---
+    col_chart1, col_chart2 = st.columns(2)
+    
+    with col_chart1:
+        st.subheader("Spending by Category")
+        fig_pie = build_pie_fig(version, range_start, range_end)
+        if fig_pie:
+            st.plotly_chart(fig_pie, use_container_width=True, key="pie_chart")
+
+    with col_chart2:
+        st.subheader("Spending Over Time")
+        fig_bar = build_trend_fig(version, range_start, range_end)
+        if fig_bar:
+            st.plotly_chart(fig_bar, use_container_width=True, key="trend_bar")
+
+    # --- RECENT TRANSACTIONS ---
+    st.divider()
+    st.subheader("📝 Recent Transactions")
+
+    # Full documents only for the 10 rows we actually show
+    recent_tx = pd.DataFrame(list(
+        collection.find({'date': {'$gte': range_start, '$lt': range_end}},
+                        {'_id': 0, 'date': 1, 'a': 1, 'c': 1, 'i': 1, 'n': 1}).sort('date', -1).limit(10)
+    ))
+
+    if not recent_tx.empty:
+        # One vectorized pass + a single markdown write instead of 10 widget trees
+        recent_tx = recent_tx.fillna({'i': 'Unknown', 'c': 'General', 'n': '', 'a': 0})
+        recent_tx['date_str'] = (recent_tx['date'].dt.day.astype(str).str.zfill(2) + ' '
+                                 + _MONTH_ABBR[recent_tx['date'].dt.month.to_numpy()])
+        amounts = recent_tx['a'].to_numpy()
+        colors = np.where(amounts < 0, '#00FF00', '#FFFFFF')
+        signs = np.where(amounts < 0, '+ ', '')
+
+        rows = []
+        for d, i, c, n, a, col, sign in zip(recent_tx['date_str'], recent_tx['i'], recent_tx['c'],
+                                            recent_tx['n'], amounts, colors, signs):
+            # Free-form Telegram text ends up in these fields — escape before
+            # interpolating into raw HTML
+            i, c = html.escape(str(i)), html.escape(str(c))
+            note = f"<br><small>📌 {html.escape(str(n))}</small>" if n else ""
+            rows.append(
+                f"<tr><td><b>{d}</b></td><td>{i} ({c}){note}</td>"
+                f"<td style='color:{col}; text-align:right'>{sign}{CURRENCY}{abs(a):g}</td></tr>"
+            )
+        st.markdown(
+            "<table style='width:100%'>" + "".join(rows) + "</table>",
+            unsafe_allow_html=True
+        )
+
+    # --- AI CHAT ---
+    with st.expander("🤖 Ask AI about your spending"):
+        user_query = st.text_input("Ask a question...")
+        if user_query:
+            import json
+            # Summarize for the AI: aggregates + a few recent rows, not all N transactions
+            by_cat = df_filtered.groupby('c')['a'].agg(['sum', 'count']).to_dict()
+            by_day = df_filtered.groupby(df_filtered['date'].dt.date)['a'].sum().to_dict()
+            recent = df_filtered.head(20)[['date', 'i', 'c', 'a']].to_dict('records')
+            data_str = json.dumps({'by_category': by_cat, 'by_day': by_day, 'recent': recent}, default=str)
+
+            # Stream tokens as they arrive; repeats replay from the session cache
+            chat_cache = st.session_state.setdefault('chat_cache', {})
+            cache_key = (user_query, data_str)
+            if cache_key in chat_cache:
+                st.markdown(chat_cache[cache_key])
+            else:
+                answer = st.write_stream(stream_chat_response(user_query, data_str))
+                # A failed stream yields the failure notice — show it, but let
+                # a retry of the same question reach the API again
+                if answer and CHAT_FAILURE not in answer:
+                    chat_cache[cache_key] = answer
+
+# import streamlit as st
+# import pandas as pd
+# import plotly.express as px
+# from utils import collection, get_chat_response
+
+# st.set_page_config(page_title="Expense Tracker", page_icon="💰", layout="wide")
+# CURRENCY = "₹" 
+
+# # CSS
+# st.markdown("""
+# <style>
+#     .metric-card {
+#         background-color: #262730;
+#         border: 1px solid #41424C;
+#         padding: 15px;
+#         border-radius: 10px;
+#         color: white;
+#     }
+# </style>
+# """, unsafe_allow_html=True)
+
+# st.title("💰 My Expenses")
+
+# cursor = collection.find()
+# data = list(cursor)
+
+# if not data:
+#     st.warning("No data found. Use your Telegram bot to add expenses!")
+# else:
+#     df = pd.DataFrame(data)
+#     df['_id'] = df['_id'].astype(str)
+#     df['date'] = pd.to_datetime(df['date'])
+
+#     st.sidebar.header("Filters")
+#     df['Month'] = df['date'].dt.strftime('%B')
+#     df['Year'] = df['date'].dt.year
+    
+#     unique_years = sorted(df['Year'].unique(), reverse=True)
+#     selected_year = st.sidebar.selectbox("Year", unique_years, index=0)
+#     df_year = df[df['Year'] == selected_year]
+    
+#     available_months = df_year['Month'].unique()
+#     selected_month = st.sidebar.selectbox("Month", ["All"] + list(available_months))
+    
+#     if selected_month != "All":
+#         df_filtered = df_year[df_year['Month'] == selected_month]
+#     else:
+#         df_filtered = df_year
+
+#     total_spent = df_filtered['a'].sum()
+#     avg_spent = df_filtered['a'].mean() if not df_filtered.empty else 0
+    
+#     col1, col2, col3 = st.columns(3)
+#     with col1: st.metric(label="Net Total", value=f"{CURRENCY}{total_spent:,.0f}")
+#     with col2: st.metric(label="Transactions", value=len(df_filtered))
+#     with col3: st.metric(label="Average / Txn", value=f"{CURRENCY}{avg_spent:,.0f}")
+
+#     st.divider()
+
+#     col_chart1, col_chart2 = st.columns(2)
+    
+#     with col_chart1:
+#         st.subheader("Spending by Category")
+#         if not df_filtered.empty:
+#             fig_pie = px.pie(df_filtered, values='a', names='c', hole=0.5, color_discrete_sequence=px.colors.qualitative.Pastel)
+#             st.plotly_chart(fig_pie, width="stretch", key="pie_chart")
+
+#     with col_chart2:
+#         st.subheader("Spending Over Time")
+#         if not df_filtered.empty:
+#             daily_trend = df_filtered.groupby(df_filtered['date'].dt.date)['a'].sum().reset_index()
+#             fig_bar = px.bar(daily_trend, x='date', y='a', color='a', color_continuous_scale="Viridis")
+#             st.plotly_chart(fig_bar, width="stretch", key="trend_bar")
+
+#     st.divider()
+#     st.subheader("📝 Recent Transactions")
+    
+#     recent_tx = df_filtered.sort_values(by="date", ascending=False).head(10)
+    
+#     for index, row in recent_tx.iterrows():
+#         with st.container():
+#             c1, c2, c3 = st.columns([1, 3, 1])
+#             c1.write(f"**{row['date'].strftime('%d %b')}**")
+            
+#             item = row.get('i', 'Unknown')
+#             category = row.get('c', 'General')
+#             note = row.get('n', "")
+            
+#             c2.write(f"{item} ({category})")
+#             if note: c2.caption(f"📌 {note}")
+            
+#             amount = row.get('a', 0)
+#             if amount < 0:
+#                 c3.markdown(f"<span style='color:#00FF00'>+ {CURRENCY}{abs(amount)}</span>", unsafe_allow_html=True)
+#             else:
+#                 c3.write(f"{CURRENCY}{amount}")
+#             st.markdown("---")
+
+#     with st.expander("🤖 Ask AI about your spending"):
+#         user_query = st.text_input("Ask a question...")
+#         if user_query:
+#             with st.spinner("Thinking..."):
+#                 # We fetch fresh data for the AI analysis
+#                 cursor = collection.find({}, {"_id": 0})
+#                 data_list = list(cursor)
+#                 answer = get_chat_response(user_query, data_list)
+#                 st.info(answer)
+
+# import streamlit as st
+# import pandas as pd
+# import plotly.express as px
+# from utils import collection, get_chat_response
+
+# # --- CONFIGURATION ---
+# st.set_page_config(page_title="Expense Tracker", page_icon="💰", layout="wide")
+# CURRENCY = "₹" 
+
+# # --- DARK MODE CSS ---
+# st.markdown("""
+# <style>
+#     .metric-card {
+#         background-color: #262730;
+#         border: 1px solid #41424C;
+#         padding: 15px;
+#         border-radius: 10px;
+#         color: white;
+#     }
+# </style>
+# """, unsafe_allow_html=True)
+
+# st.title("💰 My Expenses")
+
+# # --- LOAD DATA ---
+# cursor = collection.find()
+# data = list(cursor)
+
+# if not data:
+#     st.warning("No data found. Use your Telegram bot to add expenses!")
+# else:
+#     # Clean Data
+#     df = pd.DataFrame(data)
+#     df['_id'] = df['_id'].astype(str)
+#     df['date'] = pd.to_datetime(df['date'])
+
+#     # --- FILTERS ---
+#     st.sidebar.header("Filters")
+#     df['Month'] = df['date'].dt.strftime('%B')
+#     df['Year'] = df['date'].dt.year
+    
+#     unique_years = sorted(df['Year'].unique(), reverse=True)
+#     selected_year = st.sidebar.selectbox("Year", unique_years, index=0)
+#     df_year = df[df['Year'] == selected_year]
+    
+#     available_months = df_year['Month'].unique()
+#     selected_month = st.sidebar.selectbox("Month", ["All"] + list(available_months))
+    
+#     if selected_month != "All":
+#         df_filtered = df_year[df_year['Month'] == selected_month]
+#     else:
+#         df_filtered = df_year
+
+#     # --- METRICS ---
+#     total_spent = df_filtered['a'].sum()
+#     avg_spent = df_filtered['a'].mean() if not df_filtered.empty else 0
+    
+#     col1, col2, col3 = st.columns(3)
+#     with col1: st.metric(label="Net Total", value=f"{CURRENCY}{total_spent:,.0f}")
+#     with col2: st.metric(label="Transactions", value=len(df_filtered))
+#     with col3: st.metric(label="Average / Txn", value=f"{CURRENCY}{avg_spent:,.0f}")
+
+#     st.divider()
+
+#     # --- CHARTS ---
+#     col_chart1, col_chart2 = st.columns(2)
+    
+#     with col_chart1:
+#         st.subheader("Spending by Category")
+#         if not df_filtered.empty:
+#             fig_pie = px.pie(df_filtered, values='a', names='c', hole=0.5, color_discrete_sequence=px.colors.qualitative.Pastel)
+#             st.plotly_chart(fig_pie, width="stretch", key="pie_chart")
+
+#     with col_chart2:
+#         st.subheader("Spending Over Time")
+#         if not df_filtered.empty:
+#             daily_trend = df_filtered.groupby(df_filtered['date'].dt.date)['a'].sum().reset_index()
+#             fig_bar = px.bar(daily_trend, x='date', y='a', color='a', color_continuous_scale="Viridis")
+#             st.plotly_chart(fig_bar, width="stretch", key="trend_bar")
+
+#     # --- RECENT TRANSACTIONS LIST ---
+#     st.divider()
+#     st.subheader("📝 Recent Transactions")
+    
+#     recent_tx = df_filtered.sort_values(by="date", ascending=False).head(10)
+    
+#     for index, row in recent_tx.iterrows():
+#         with st.container():
+#             c1, c2, c3 = st.columns([1, 3, 1])
+            
+#             # Date
+#             c1.write(f"**{row['date'].strftime('%d %b')}**")
+            
+#             # Item + Note
+#             item = row.get('i', 'Unknown')
+#             category = row.get('c', 'General')
+#             note = row.get('n', "")
+            
+#             c2.write(f"{item} ({category})")
+#             if note: c2.caption(f"📌 {note}")
+            
+#             # Amount (Color Logic)
+#             amount = row.get('a', 0)
+#             if amount < 0:
+#                 c3.markdown(f"<span style='color:#00FF00'>+ {CURRENCY}{abs(amount)}</span>", unsafe_allow_html=True)
+#             else:
+#                 c3.write(f"{CURRENCY}{amount}")
+                
+#             st.markdown("---")
+
+#     # --- AI CHAT ---
+#     with st.expander("🤖 Ask AI about your spending"):
+#         user_query = st.text_input("Ask a question...")
+#         if user_query:
+#             with st.spinner("Thinking..."):
+#                 data_str = df_filtered.to_json(orient="records", date_format="iso")
+#                 answer = get_chat_response(user_query, data_str)
+
+#                 st.info(answer)
+
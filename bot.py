@@ -1,246 +1,396 @@
-import os
-import json
-import re
-from datetime import datetime
-from flask import Flask
-from threading import Thread
-from telegram import Update
-from telegram.ext import ApplicationBuilder, ContextTypes, MessageHandler, filters
-from utils import parse_expense_with_gemini, add_expense, delete_expense, get_chat_response, collection
-
-# --- CONFIGURATION ---
-TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
-DASHBOARD_URL = "https://financeproject-daozlrb2223siae3uzttph.streamlit.app/" 
-
-# --- KEEP ALIVE ---
-flask_app = Flask('')
-@flask_app.route('/')
-def home(): return "Alive"
-def run_http(): flask_app.run(host='0.0.0.0', port=8080)
-def keep_alive():
-    t = Thread(target=run_http)
-    t.start()
-
-# --- HELPER: EMOJI MAP ---
-def get_category_emoji(category):
-    map = {
-        "Food": "🍔", "Groceries": "🥦", "Travel": "🚖", "Medical": "💊",
-        "Subscriptions": "📅", "Electronics": "🔌", "Shopping": "🛍️",
-        "Education": "📚", "Gifts": "🎁", "Outings": "🎉", 
-        "Rent & Utilities": "🏠", "Investments": "📈", "Entertainment": "🎬",
-        "Personal Care": "🧴", "Loans/EMI": "🏦", "Debt": "📝", 
-        "Loan Given": "🤝", "Miscellaneous": "📦"
-    }
-    return map.get(category, "💵")
-
-# --- HELPER: FORMAT DATA ---
-def format_transactions(cursor_list):
-    clean_data = []
-    for entry in cursor_list:
-        date_str = entry['date'].strftime('%Y-%m-%d')
-        clean_entry = {"Date": date_str, "Item": entry['i'], "Amount": entry['a'], "Category": entry['c']}
-        if entry.get('n'): clean_entry["Note"] = entry['n']
-        clean_data.append(clean_entry)
-    return json.dumps(clean_data)
-
-# --- EMERGENCY FALLBACK PARSER ---
-def manual_fallback_parse(text):
-    """
-    If AI fails, try to capture 'Item Amount' using simple regex.
-    """
-    match = re.search(r'^(.+?)\s+(\d+(\.\d+)?)$', text)
-    if match:
-        item = match.group(1).strip().title()
-        amount = float(match.group(2))
-        return [{
-            "action": "add",
-            "i": item,
-            "a": amount,
-            "c": "Miscellaneous", 
-            "n": "Manual Fallback"
-        }]
-    return None
-
-# --- BOT LOGIC ---
-async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if not update.message or not update.message.text: return
-    
-    user_text = update.message.text
-    user_id = update.effective_user.id
-    text_lower = user_text.lower()
-    
-    # 1. TRY AI PARSING
-    parsed_list = parse_expense_with_gemini(user_text)
-
-    # 2. IF AI FAILS, TRY MANUAL FALLBACK
-    if parsed_list is None:
-        parsed_list = manual_fallback_parse(user_text)
-
-    # 3. IF BOTH FAIL -> ASSUME CHAT / ANALYSIS
-    if parsed_list is None or "?" in user_text or "how" in text_lower or "total" in text_lower:
-        
-        if "dashboard" in text_lower:
-             await update.message.reply_text(f"📊 **Dashboard:**\n{DASHBOARD_URL}", parse_mode='Markdown')
-             return
-        
-        cursor = collection.find({}, {"_id": 0}).sort("date", -1).limit(300)
-        data_list = list(cursor)
-
-        if not data_list:
-            await update.message.reply_text("📂 No data found yet.")
-            return
-
-        clean_context_str = format_transactions(data_list)
-        processing_msg = await update.message.reply_text(f"🤔 Analyzing...")
-        
-        answer = get_chat_response(user_text, clean_context_str)
-        
-        try:
-            await context.bot.edit_message_text(chat_id=user_id, message_id=processing_msg.message_id, text=answer, parse_mode='Markdown')
-        except:
-            await context.bot.edit_message_text(chat_id=user_id, message_id=processing_msg.message_id, text=answer, parse_mode=None)
-        
-    # 4. SAVE TRANSACTION
-    else:
-        reply_lines = []
-        for data in parsed_list:
-            if data.get('action') == 'delete':
-                success, item, date = delete_expense(data)
-                if success: 
-                    d_str = date.strftime('%d %b')
-                    reply_lines.append(f"🗑️ **Deleted:** {item} ({data['a']})")
-                else: 
-                    reply_lines.append(f"⚠️ **Not Found:** {data['i']}")
-            else:
-                add_expense(data)
-                
-                # Get Emoji
-                emoji = get_category_emoji(data['c'])
-                if data['a'] < 0: emoji = "🤑"
-                
-                line = f"{emoji} **{data['i']}**\n     └ {data['a']}  |  _{data['c']}_"
-                
-                if data.get('n') and "Manual" not in data['n']: 
-                    line += f"\n     └ 📌 {data['n']}"
-                
-                reply_lines.append(line)
-
-        summary = "\n\n".join(reply_lines)
-        receipt = f"🧾 **Transaction Saved**\n────────────────\n{summary}\n────────────────\n📊 [Dashboard]({DASHBOARD_URL})"
-        try:
-            await update.message.reply_text(receipt, parse_mode='Markdown')
-        except:
-            await update.message.reply_text(receipt, parse_mode=None)
-
-if __name__ == '__main__':
-    keep_alive()
-    app = ApplicationBuilder().token(TELEGRAM_TOKEN).build()
-    echo_handler = MessageHandler(filters.TEXT & (~filters.COMMAND), handle_message)
-    app.add_handler(echo_handler)
-    print("Bot is running...")
-    app.run_polling()
-
-# import os
-# from flask import Flask
-# from threading import Thread
-
-# flask_app = Flask('')
-
-# @flask_app.route('/')
-# def home():
-#     return "I am alive!"
-
-# def run_http():
-#     flask_app.run(host='0.0.0.0', port=8080)
-
-# def keep_alive():
-#     t = Thread(target=run_http)
-#     t.start()
-
-# from telegram import Update
-# from telegram.ext import ApplicationBuilder, ContextTypes, MessageHandler, filters
-# from utils import parse_expense_with_gemini, add_expense, delete_expense, get_chat_response, collection
-
-# # --- CONFIGURATION ---
-# # ⚠️ PASTE YOUR TELEGRAM TOKEN HERE
-# TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
-# DASHBOARD_URL = "http://financeproject-daozlrb2223siae3uzttph.streamlit.app"
-
-# async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
-#     # Safety check: Ignore edits or non-text updates
-#     if not update.message or not update.message.text: return
-    
-#     user_text = update.message.text
-#     user_id = update.effective_user.id
-    
-#     # 1. DASHBOARD / QUESTIONS
-#     text_lower = user_text.lower()
-#     if "?" in user_text or "how" in text_lower or "show" in text_lower or "dashboard" in text_lower or "owe" in text_lower:
-        
-#         if "dashboard" in text_lower:
-#              await update.message.reply_text(f"📊 Dashboard: {DASHBOARD_URL}")
-#              return
-        
-#         # Fetch context for AI
-#         cursor = collection.find({}, {"_id": 0}).sort("date", -1).limit(30)
-#         data_context = list(cursor)
-        
-#         processing_msg = await update.message.reply_text(f"🤔 Analyzing...")
-#         answer = get_chat_response(user_text, str(data_context))
-#         await context.bot.edit_message_text(chat_id=user_id, message_id=processing_msg.message_id, text=answer)
-        
-#     # 2. TRANSACTION PROCESSING (BATCH SUPPORT)
-#     else:
-#         parsed_list = parse_expense_with_gemini(user_text)
-        
-#         if parsed_list:
-#             reply_lines = []
-            
-#             # Loop through every item found
-#             for data in parsed_list:
-#                 if data.get('action') == 'delete':
-#                     success = delete_expense(data)
-#                     if success: reply_lines.append(f"🗑️ Deleted: {data['i']}")
-#                     else: reply_lines.append(f"⚠️ Not found: {data['i']}")
-#                 else:
-#                     add_expense(data)
-                    
-#                     # Icon Logic
-#                     if data['c'] == 'Debt': icon = "📝"
-#                     elif data['a'] < 0: icon = "🤑"
-#                     else: icon = "✅"
-                    
-#                     # Build line
-#                     line = f"{icon} {data['i']}: {data['a']} ({data['c']})"
-                    
-#                     # Append Note if it exists
-#                     if data.get('n'):
-#                         line += f"\n   └ 📌 _{data['n']}_"
-                    
-#                     reply_lines.append(line)
-
-#             # Send Summary
-#             summary = "\n".join(reply_lines)
-#             await update.message.reply_text(f"**Saved:**\n\n{summary}\n────────────────\n📊 {DASHBOARD_URL}", parse_mode='Markdown')
-            
-#         else:
-#             await update.message.reply_text("😅 I didn't understand.")
-
-# if __name__ == '__main__':
-#     keep_alive()
-#     app = ApplicationBuilder().token(TELEGRAM_TOKEN).build()
-#     echo_handler = MessageHandler(filters.TEXT & (~filters.COMMAND), handle_message)
-#     app.add_handler(echo_handler)
-#     print("Bot is running...")
-#     app.run_polling()
-
-
-
-
-
-
-
-
-
-
-
+import os
+import orjson
+import re
+import asyncio
+from datetime import datetime
+from threading import Lock
+from collections import deque
+from telegram import Update
+from telegram.constants import ParseMode
+from telegram.helpers import escape_markdown
+from telegram.ext import ApplicationBuilder, ContextTypes, Defaults, MessageHandler, filters
+from utils import parse_expenses_batch, bulk_add_expenses, bulk_delete_expenses, get_chat_response, get_collection, normalize_text, prewarm_backends, NO_CACHE_RE
+
+# --- CONFIGURATION ---
+TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
+DASHBOARD_URL = "https://financeproject-daozlrb2223siae3uzttph.streamlit.app/"
+
+# Month LUT for reply dates — skips locale-aware strftime per line
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+# Receipt frame built once, not re-interpolated per message
+_RECEIPT_HEADER = "🧾 **Transaction Saved**\n────────────────\n"
+_RECEIPT_FOOTER = f"\n────────────────\n📊 [Dashboard]({DASHBOARD_URL})"
+
+# --- INTENT REGEXES (compiled once, single scan instead of N substring checks) ---
+_INTENT_RE = re.compile(r'[?]|\b(how|show|dashboard|owe|total|calculate|summary|breakdown)\b', re.I)
+_DASH_RE = re.compile(r'dashboard', re.I)
+
+# Cap in-flight Gemini calls at the API quota; calls run off the event loop
+GEMINI_SEM = asyncio.Semaphore(8)
+
+# --- PARSE MICRO-BATCHING ---
+# Concurrent parse requests collected within a 50ms window go to Gemini
+# as one batched prompt instead of one call per message.
+_PARSE_QUEUE = asyncio.Queue()
+_BATCH_WINDOW = 0.05
+_BATCH_MAX = 16
+
+async def parse_batch_worker():
+    while True:
+        items = [await _PARSE_QUEUE.get()]
+        await asyncio.sleep(_BATCH_WINDOW)
+        while len(items) < _BATCH_MAX:
+            try:
+                items.append(_PARSE_QUEUE.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+
+        texts = [text for text, _ in items]
+        try:
+            async with GEMINI_SEM:
+                results = await asyncio.to_thread(parse_expenses_batch, texts)
+        except Exception as e:
+            print(f"Batch Worker Error: {e}")
+            results = [None] * len(texts)
+
+        for (_, fut), result in zip(items, results):
+            if not fut.done(): fut.set_result(result)
+
+# --- PARSE RESULT CACHE (repeated phrases like "coffee 120" skip Gemini) ---
+# Values are serialized so every hit hands back fresh dicts. Deletes and
+# date-relative phrasing depend on state, so they are never cached.
+_PARSE_CACHE = {}
+_PARSE_CACHE_MAX = 2048
+
+async def parse_via_batch(user_text):
+    norm = normalize_text(user_text)
+    cacheable = not NO_CACHE_RE.search(norm)
+
+    if cacheable:
+        cached = _PARSE_CACHE.get(norm)
+        if cached is not None:
+            return orjson.loads(cached)
+
+    fut = asyncio.get_running_loop().create_future()
+    await _PARSE_QUEUE.put((user_text, fut))
+    result = await fut
+
+    # Only cache real parses: None is ambiguous (chat intent, but also the
+    # failure value a Gemini outage produces) and must never be replayed
+    if cacheable and result:
+        if len(_PARSE_CACHE) >= _PARSE_CACHE_MAX:
+            _PARSE_CACHE.pop(next(iter(_PARSE_CACHE)))
+        _PARSE_CACHE[norm] = orjson.dumps(result)
+    return result
+
+# --- ROLLING "RECENT 300" CONTEXT ---
+# The bot is the only writer, so a write-maintained in-process list stays
+# fresh without re-querying Mongo on every question. Adds push onto the
+# deque; deletes force a reload. _RECENT_CTX holds the serialized form.
+_RECENT_DOCS = deque(maxlen=300)
+_RECENT_LOADED = False
+_RECENT_CTX = None
+_RECENT_LOCK = Lock()
+
+# --- KEEP ALIVE (served on the bot's event loop, no extra thread) ---
+_PING_RESPONSE = (b"HTTP/1.1 200 OK\r\nContent-Type: text/plain\r\n"
+                  b"Content-Length: 5\r\nConnection: close\r\n\r\nAlive")
+
+async def serve_ping(reader, writer):
+    try:
+        await reader.read(1024)
+        writer.write(_PING_RESPONSE)
+        await writer.drain()
+    finally:
+        writer.close()
+
+async def keep_alive(application):
+    await asyncio.start_server(serve_ping, '0.0.0.0', 8080)
+    application.create_task(parse_batch_worker())
+    # Warm Mongo + Gemini in the background while polling starts
+    application.create_task(asyncio.to_thread(prewarm_backends))
+
+# --- HELPER: EMOJI MAP (built once at import, not per call) ---
+CATEGORY_EMOJIS = {
+    "Food": "🍔", "Groceries": "🥦", "Travel": "🚖", "Medical": "💊",
+    "Subscriptions": "📅", "Electronics": "🔌", "Shopping": "🛍️",
+    "Education": "📚", "Gifts": "🎁", "Outings": "🎉",
+    "Rent & Utilities": "🏠", "Investments": "📈", "Entertainment": "🎬",
+    "Personal Care": "🧴", "Loans/EMI": "🏦", "Debt": "📝",
+    "Loan Given": "🤝", "Miscellaneous": "📦"
+}
+
+def get_category_emoji(category):
+    return CATEGORY_EMOJIS.get(category, "💵")
+
+# --- HELPER: FORMAT DATA ---
+# Words from the category names let a question like "how much on travel?"
+# pre-filter the context down to the rows that can answer it
+_CATEGORY_WORDS = {w.lower(): c for c in CATEGORY_EMOJIS for w in re.findall(r'[A-Za-z]+', c)}
+_CATEGORY_HINT_RE = re.compile(r'\b(' + '|'.join(_CATEGORY_WORDS) + r')\b', re.I)
+
+def _context_for_query(query, docs):
+    """Columnar (struct-of-arrays) chat context.
+
+    Field names are serialized once per context instead of once per row —
+    roughly half the tokens of a list of dicts — and when the question names
+    a category only matching rows are sent. Prompt adaptation: the model
+    sees less, answers the same.
+    """
+    # Keep rows for every category the question names — a comparison like
+    # "more on food or travel?" needs both sides present
+    wanted = {_CATEGORY_WORDS[w.lower()] for w in _CATEGORY_HINT_RE.findall(query)}
+    if wanted:
+        filtered = [d for d in docs if d.get('c') in wanted]
+        if filtered:
+            docs = filtered
+    cols = {"dates": [], "items": [], "amounts": [], "categories": [], "notes": []}
+    for entry in docs:
+        cols["dates"].append(entry['date'].date().isoformat())
+        cols["items"].append(entry['i'])
+        cols["amounts"].append(entry['a'])
+        cols["categories"].append(entry['c'])
+        cols["notes"].append(entry.get('n') or "")
+    return orjson.dumps(cols).decode()
+
+# --- EMERGENCY FALLBACK PARSER ---
+_FALLBACK_RE = re.compile(r'^(.+?)\s+(\d+(?:\.\d+)?)$')
+
+def manual_fallback_parse(text):
+    """
+    If AI fails, try to capture 'Item Amount' using simple regex.
+    """
+    match = _FALLBACK_RE.match(text)
+    if match:
+        item = match.group(1).strip().title()
+        amount = float(match.group(2))
+        return [{
+            "action": "add",
+            "i": item,
+            "a": amount,
+            "c": "Miscellaneous", 
+            "n": "Manual Fallback"
+        }]
+    return None
+
+# --- BOT LOGIC ---
+async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not update.message or not update.message.text: return
+    global _RECENT_LOADED, _RECENT_CTX
+
+    user_text = update.message.text
+
+    # 1. CHEAP INTENT CHECK FIRST — question-shaped messages skip the Gemini parse
+    parsed_list = None
+    if not _INTENT_RE.search(user_text):
+        # 2. TRY AI PARSING (coalesced through the micro-batch queue)
+        parsed_list = await parse_via_batch(user_text)
+
+        # 3. IF AI FAILS, TRY MANUAL FALLBACK
+        if parsed_list is None:
+            parsed_list = manual_fallback_parse(user_text)
+
+    # 4. NO TRANSACTION -> CHAT / ANALYSIS
+    if parsed_list is None:
+
+        if _DASH_RE.search(user_text):
+             await update.message.reply_text(f"📊 **Dashboard:**\n{DASHBOARD_URL}")
+             return
+        
+        # Category-hinted questions get a per-query filtered context; only the
+        # unfiltered serialization is worth caching
+        has_hint = bool(_CATEGORY_HINT_RE.search(user_text))
+        with _RECENT_LOCK:
+            clean_context_str = None if has_hint else _RECENT_CTX
+            loaded = _RECENT_LOADED
+
+        if clean_context_str is None:
+            if not loaded:
+                cursor = get_collection().find({}, {"_id": 0, "date": 1, "i": 1, "a": 1, "c": 1, "n": 1}) \
+                                   .sort("date", -1).limit(300)
+                # Blocking pymongo call runs off the event loop
+                data_list = await asyncio.to_thread(list, cursor)
+                with _RECENT_LOCK:
+                    _RECENT_DOCS.clear()
+                    _RECENT_DOCS.extend(data_list)
+                    _RECENT_LOADED = True
+
+            with _RECENT_LOCK:
+                data_list = list(_RECENT_DOCS)
+
+            if not data_list:
+                await update.message.reply_text("📂 No data found yet.")
+                return
+
+            clean_context_str = _context_for_query(user_text, data_list)
+            if not has_hint:
+                with _RECENT_LOCK:
+                    _RECENT_CTX = clean_context_str
+
+        user_id = update.effective_user.id
+        processing_msg = await update.message.reply_text(f"🤔 Analyzing...")
+        
+        async with GEMINI_SEM:
+            answer = await asyncio.to_thread(get_chat_response, user_text, clean_context_str)
+        
+        try:
+            await context.bot.edit_message_text(chat_id=user_id, message_id=processing_msg.message_id, text=answer)
+        except:
+            await context.bot.edit_message_text(chat_id=user_id, message_id=processing_msg.message_id, text=answer, parse_mode=None)
+        
+    # 5. SAVE TRANSACTION
+    else:
+        # One pass for the sign override + category icon, zipped back below
+        icons = ["🤑" if d.get('a', 0) < 0 else get_category_emoji(d.get('c')) for d in parsed_list]
+
+        # All adds go out in a single insert_many round-trip
+        to_add = [d for d in parsed_list if d.get('action') != 'delete']
+        if to_add:
+            added_docs = await asyncio.to_thread(bulk_add_expenses, to_add)
+            with _RECENT_LOCK:
+                if _RECENT_LOADED:
+                    for doc in reversed(added_docs):
+                        _RECENT_DOCS.appendleft(doc)
+                _RECENT_CTX = None  # reserialize lazily on next question
+
+        # All deletes resolve in one aggregation + one delete_many
+        to_delete = [d for d in parsed_list if d.get('action') == 'delete']
+        if to_delete:
+            delete_results = iter(await asyncio.to_thread(bulk_delete_expenses, to_delete))
+            with _RECENT_LOCK:
+                # Deleted docs may be anywhere in the rolling list — reload next time
+                _RECENT_LOADED = False
+                _RECENT_CTX = None
+
+        reply_lines = []
+        for data, emoji in zip(parsed_list, icons):
+            if data.get('action') == 'delete':
+                success, item, date = next(delete_results)
+                if success:
+                    d_str = f"{date.day:02d} {_MONTHS[date.month - 1]}"
+                    reply_lines.append(f"🗑️ **Deleted:** {escape_markdown(str(item))} ({data['a']})")
+                else:
+                    reply_lines.append(f"⚠️ **Not Found:** {escape_markdown(str(data['i']))}")
+            else:
+                note = data.get('n', "")
+                note_part = f"\n     └ 📌 {escape_markdown(note)}" if note and "Manual" not in note else ""
+
+                reply_lines.append(f"{emoji} **{escape_markdown(data['i'])}**\n     └ {data['a']}  |  _{escape_markdown(data['c'])}_{note_part}")
+
+        receipt = "".join([_RECEIPT_HEADER, "\n\n".join(reply_lines), _RECEIPT_FOOTER])
+        # User-derived fields are escaped above, so the Markdown send can't fail
+        await update.message.reply_text(receipt)
+
+if __name__ == '__main__':
+    app = ApplicationBuilder().token(TELEGRAM_TOKEN).defaults(Defaults(parse_mode=ParseMode.MARKDOWN)) \
+                              .concurrent_updates(True).post_init(keep_alive).build()
+    echo_handler = MessageHandler(filters.TEXT & (~filters.COMMAND), handle_message, block=False)
+    app.add_handler(echo_handler)
+    print("Bot is running...")
+    app.run_polling()
+
+# import os
+# from flask import Flask
+# from threading import Thread
+
+# flask_app = Flask('')
+
+# @flask_app.route('/')
+# def home():
+#     return "I am alive!"
+
+# def run_http():
+#     flask_app.run(host='0.0.0.0', port=8080)
+
+# def keep_alive():
+#     t = Thread(target=run_http)
+#     t.start()
+
+# from telegram import Update
+# from telegram.ext import ApplicationBuilder, ContextTypes, MessageHandler, filters
+# from utils import parse_expense_with_gemini, add_expense, delete_expense, get_chat_response, collection
+
+# # --- CONFIGURATION ---
+# # ⚠️ PASTE YOUR TELEGRAM TOKEN HERE
+# TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
+# DASHBOARD_URL = "http://financeproject-daozlrb2223siae3uzttph.streamlit.app"
+
+# async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
+#     # Safety check: Ignore edits or non-text updates
+#     if not update.message or not update.message.text: return
+    
+#     user_text = update.message.text
+#     user_id = update.effective_user.id
+    
+#     # 1. DASHBOARD / QUESTIONS
+#     text_lower = user_text.lower()
+#     if "?" in user_text or "how" in text_lower or "show" in text_lower or "dashboard" in text_lower or "owe" in text_lower:
+        
+#         if "dashboard" in text_lower:
+#              await update.message.reply_text(f"📊 Dashboard: {DASHBOARD_URL}")
+#              return
+        
+#         # Fetch context for AI
+#         cursor = collection.find({}, {"_id": 0}).sort("date", -1).limit(30)
+#         data_context = list(cursor)
+        
+#         processing_msg = await update.message.reply_text(f"🤔 Analyzing...")
+#         answer = get_chat_response(user_text, str(data_context))
+#         await context.bot.edit_message_text(chat_id=user_id, message_id=processing_msg.message_id, text=answer)
+        
+#     # 2. TRANSACTION PROCESSING (BATCH SUPPORT)
+#     else:
+#         parsed_list = parse_expense_with_gemini(user_text)
+        
+#         if parsed_list:
+#             reply_lines = []
+            
+#             # Loop through every item found
+#             for data in parsed_list:
+#                 if data.get('action') == 'delete':
+#                     success = delete_expense(data)
+#                     if success: reply_lines.append(f"🗑️ Deleted: {data['i']}")
+#                     else: reply_lines.append(f"⚠️ Not found: {data['i']}")
+#                 else:
+#                     add_expense(data)
+                    
+#                     # Icon Logic
+#                     if data['c'] == 'Debt': icon = "📝"
+#                     elif data['a'] < 0: icon = "🤑"
+#                     else: icon = "✅"
+                    
+#                     # Build line
+#                     line = f"{icon} {data['i']}: {data['a']} ({data['c']})"
+                    
+#                     # Append Note if it exists
+#                     if data.get('n'):
+#                         line += f"\n   └ 📌 _{data['n']}_"
+                    
+#                     reply_lines.append(line)
+
+#             # Send Summary
+#             summary = "\n".join(reply_lines)
+#             await update.message.reply_text(f"**Saved:**\n\n{summary}\n────────────────\n📊 {DASHBOARD_URL}", parse_mode='Markdown')
+            
+#         else:
+#             await update.message.reply_text("😅 I didn't understand.")
+
+# if __name__ == '__main__':
+#     keep_alive()
+#     app = ApplicationBuilder().token(TELEGRAM_TOKEN).build()
+#     echo_handler = MessageHandler(filters.TEXT & (~filters.COMMAND), handle_message)
+#     app.add_handler(echo_handler)
+#     print("Bot is running...")
+#     app.run_polling()
+
+
+
+
+
+
+
+
+
+
+
@@ -1,410 +1,499 @@
-import os
-import google.generativeai as genai
-from pymongo import MongoClient
-from datetime import datetime
-import json
-import re
-import time
-import certifi
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
-
-# --- CONFIGURATION ---
-MONGO_URI = os.getenv("MONGO_URI")
-GEMINI_KEY = os.getenv("GEMINI_KEY")
-
-# --- SETUP ---
-cluster = MongoClient(MONGO_URI, tlsCAFile=certifi.where())
-db = cluster["expense_tracker"]
-collection = db["expenses"]
-
-genai.configure(api_key=GEMINI_KEY)
-
-# --- SAFETY SETTINGS (Disable filters) ---
-safety_config = {
-    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-}
-
-model = genai.GenerativeModel('gemini-2.5-flash', safety_settings=safety_config)
-
-# --- FUNCTIONS ---
-
-def clean_json_string(text):
-    """
-    Robust JSON extractor using Regex. 
-    Finds the first [...] or {...} block.
-    """
-    text = text.replace('```json', '').replace('```', '').strip()
-    match = re.search(r'(\[.*?\]|\{.*?\})', text, re.DOTALL)
-    if match:
-        return match.group(1)
-    return text
-
-def safe_float_conversion(value):
-    """
-    Handles numbers (50), strings ("50"), and math ("100/2").
-    """
-    try:
-        if isinstance(value, (int, float)): return float(value)
-        if isinstance(value, str):
-            # Clean string to only allow math chars
-            clean_math = re.sub(r'[^0-9\.\/\*\+\-\(\)]', '', value)
-            return float(eval(clean_math))
-    except:
-        return 0.0
-    return 0.0
-
-def parse_expense_with_gemini(user_text):
-    prompt = f"""
-    You are a specialized Data Extractor. User Input: "{user_text}"
-    
-    STEP 1: IDENTIFY INTENT
-    - Is the user asking a question, asking for a breakdown, or correcting a previous calculation? -> Return {{ "is_chat": true }}
-    - Is the user entering transaction data? -> Extract the data.
-
-    STEP 2: EXTRACT DATA (If transaction)
-    - MATH: Calculate "A/B" immediately (e.g. "100/2" -> 50).
-    - NOTE: Extract context note into 'n' only if user says "save c", "context", or "note".
-
-    STEP 3: CATEGORIZE (STRICT 18 RULES)
-    1. Food: Meals, drinks, snacks, tea, restaurant, meal plans. NOT Outings.
-    2. Groceries: Raw kitchen items, fruits, vegetables, grains, spices.
-    3. Travel: Bus, auto, cab, bike, fuel, train, flight.
-    4. Medical: Doctor, medicine, tests, pharmacy, supplements.
-    5. Subscriptions: Netflix, Spotify, Gym, Cloud, Apps, Prime, Memberships.
-    6. Electronics: Gadgets, phones, chargers, repairs, appliances, headphones.
-    7. Shopping: Clothes, shoes, bags, accessories, watches, wallets.
-    8. Education: Books, courses, exams, stationery, work materials, skill dev.
-    9. Gifts: Birthday treats, gifts for others. NOT Outings.
-    10. Outings: Hangouts, events, festivals (Balijatra), clubs, trips.
-    11. Rent & Utilities: Rent, electricity, water, maintenance.
-    12. Investments: Savings, deposits, mutual funds.
-    13. Entertainment: Movie tickets, games, events (non-outing).
-    14. Personal Care: Soap, shampoo, cosmetics, hygiene.
-    15. Loans/EMI: Repaying loans, EMIs.
-    16. Miscellaneous: Anything else.
-    17. Debt: Future payments ("Owe", "Will pay", "Bill due").
-    18. Loan Given: Past payments to others ("Lent", "Gave").
-    
-    Output JSON (Transaction):
-    [ {{"action": "add", "i": "Item", "a": 50, "c": "Category", "n": ""}} ]
-    
-    Output JSON (Chat):
-    {{ "is_chat": true }}
-    """
-    try:
-        response = model.generate_content(prompt)
-        cleaned_text = clean_json_string(response.text)
-        data = json.loads(cleaned_text)
-        
-        if isinstance(data, dict) and data.get("is_chat"): return None
-        if isinstance(data, dict): data = [data]
-        
-        valid_data = []
-        for entry in data:
-            # Title Case
-            if 'i' in entry: entry['i'] = str(entry['i']).title()
-            if 'c' in entry: entry['c'] = str(entry['c']).title()
-            
-            # Robust Math
-            raw_amount = entry.get('a', 0)
-            entry['a'] = safe_float_conversion(raw_amount)
-            
-            if entry['a'] == 0: continue
-            if 'n' not in entry: entry['n'] = ""
-            valid_data.append(entry)
-            
-        return valid_data if valid_data else None
-
-    except Exception as e:
-        print(f"Parsing Logic Error: {e}")
-        return None
-
-def add_expense(data):
-    entry = {"i": data['i'], "a": data['a'], "c": data['c'], "n": data.get('n', ""), "date": datetime.now()}
-    collection.insert_one(entry)
-
-def delete_expense(data):
-    query = {"a": data['a'], "i": {"$regex": data['i'], "$options": "i"}}
-    matches = list(collection.find(query).sort("date", -1))
-    if len(matches) > 0:
-        target = matches[0]
-        collection.delete_one({"_id": target["_id"]})
-        return True, target['i'], target['date']
-    return False, None, None
-
-def get_chat_response(query, user_data_context):
-    today_str = datetime.now().strftime('%Y-%m-%d')
-    prompt = f"""
-    You are a Financial Analyst. Today: {today_str}
-    User Question: {query}
-    Data: {user_data_context}
-    
-    RULES:
-    1. Filter data by date relative to today.
-    2. Sum items accurately.
-    3. Use Markdown (**bold**). NO HTML.
-    """
-    
-    for attempt in range(2):
-        try:
-            response = model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            print(f"Chat Attempt {attempt+1} Failed: {e}")
-            time.sleep(1)
-            
-    return "⚠️ Google AI is currently overloaded or blocking this request. Please try again in 1 minute."
-
-# import os
-# import google.generativeai as genai
-# from pymongo import MongoClient
-# from datetime import datetime
-# import json
-# import re
-# import certifi
-
-# # --- CONFIGURATION ---
-# MONGO_URI = os.getenv("MONGO_URI")
-# GEMINI_KEY = os.getenv("GEMINI_KEY")
-
-# # --- SETUP ---
-# cluster = MongoClient(MONGO_URI, tlsCAFile=certifi.where())
-# db = cluster["expense_tracker"]
-# collection = db["expenses"]
-
-# genai.configure(api_key=GEMINI_KEY)
-# model = genai.GenerativeModel('gemini-2.5-flash')
-
-# # --- FUNCTIONS ---
-
-# def clean_json_string(text):
-#     text = text.replace('```json', '').replace('```', '').strip()
-#     if text.startswith('['):
-#         start = text.find('[')
-#         end = text.rfind(']')
-#         if start != -1 and end != -1: return text[start:end+1]
-#     else:
-#         start = text.find('{')
-#         end = text.rfind('}')
-#         if start != -1 and end != -1: return text[start:end+1]
-#     return text
-
-# def parse_expense_with_gemini(user_text):
-#     prompt = f"""
-#     You are a specialized Expense Tracker Parser. 
-#     User Input: "{user_text}"
-    
-#     Task: Extract transactions into a JSON LIST.
-    
-#     --- MATH RULE ---
-#     If amount is "A/B" (e.g. "100/2"), CALCULATE it (e.g. 50).
-
-#     --- CATEGORY RULES (STRICT) ---
-#     1. Food: Meals, drinks, snacks, tea, restaurant, meal plans. NOT Outings.
-#     2. Groceries: Raw kitchen items, fruits, vegetables, grains, spices.
-#     3. Travel: Bus, auto, cab, bike, fuel, train, flight.
-#     4. Medical: Doctor, medicine, tests, pharmacy, supplements.
-#     5. Subscriptions: Netflix, Spotify, Gym, Cloud, Apps, Prime, Memberships.
-#     6. Electronics: Gadgets, phones, chargers, repairs, appliances, headphones.
-#     7. Shopping: Clothes, shoes, bags, accessories, watches, wallets.
-#     8. Education: Books, courses, exams, stationery, work materials, skill dev.
-#     9. Gifts: Birthday treats, gifts for others. NOT Outings.
-#     10. Outings: Hangouts, events, festivals, clubs, trips.
-#     11. Rent & Utilities: Rent, electricity, water, maintenance.
-#     12. Investments: Savings, deposits, mutual funds.
-#     13. Entertainment: Movie tickets, games, events (non-outing).
-#     14. Personal Care: Soap, shampoo, cosmetics, hygiene.
-#     15. Loans/EMI: Repaying loans, EMIs.
-#     16. Miscellaneous: Anything else.
-
-#     --- OUTPUT FORMAT ---
-#     Return JSON LIST:
-#     [
-#       {{"action": "add", "i": "Netflix", "a": 199, "c": "Subscriptions", "n": "Monthly"}}
-#     ]
-#     """
-#     try:
-#         response = model.generate_content(prompt)
-#         cleaned_text = clean_json_string(response.text)
-#         data = json.loads(cleaned_text)
-        
-#         if isinstance(data, dict): data = [data]
-            
-#         for entry in data:
-#             if 'i' in entry: entry['i'] = str(entry['i']).title()
-#             if 'c' in entry: entry['c'] = str(entry['c']).title()
-#             if 'a' in entry: entry['a'] = float(entry['a'])
-#             if 'n' not in entry: entry['n'] = ""
-            
-#         return data
-#     except Exception as e:
-#         print(f"Parsing Error: {e}")
-#         return None
-
-# def add_expense(data):
-#     entry = {
-#         "i": data['i'], "a": data['a'], "c": data['c'], 
-#         "n": data.get('n', ""), "date": datetime.now()
-#     }
-#     collection.insert_one(entry)
-
-# def delete_expense(data):
-#     query = {"a": data['a'], "i": {"$regex": data['i'], "$options": "i"}}
-#     matches = list(collection.find(query).sort("date", -1))
-#     if len(matches) > 0:
-#         target = matches[0]
-#         collection.delete_one({"_id": target["_id"]})
-#         return True, target['i'], target['date']
-#     return False, None, None
-
-# def get_chat_response(query, user_data_context):
-#     prompt = f"""
-#     You are a Financial Analyst.
-#     User Data (JSON): {user_data_context}
-#     User Question: {query}
-#     Instructions:
-#     - Filter data by date relative to today ({datetime.now().strftime('%Y-%m-%d')}).
-#     - Sum amounts accurately.
-#     - Keep answers short.
-#     """
-#     response = model.generate_content(prompt)
-#     return response.text
-
-# import os
-# import google.generativeai as genai
-# from pymongo import MongoClient
-# from datetime import datetime
-# import json
-# import re
-# import certifi
-
-# # --- CONFIGURATION ---
-# # ⚠️ PASTE YOUR ACTUAL KEYS HERE
-# MONGO_URI = os.getenv("MONGO_URI")
-# GEMINI_KEY = os.getenv("GEMINI_KEY")
-
-# # --- SETUP ---
-# # We use certifi to prevent SSL errors on Windows
-# cluster = MongoClient(MONGO_URI, tlsCAFile=certifi.where())
-# db = cluster["expense_tracker"]
-# collection = db["expenses"]
-
-# genai.configure(api_key=GEMINI_KEY)
-# model = genai.GenerativeModel('gemini-2.5-flash')
-
-# # --- FUNCTIONS ---
-
-# def clean_json_string(text):
-#     """
-#     Robust cleaner: Handles both Single Objects {} and Lists []
-#     """
-#     text = text.replace('```json', '').replace('```', '').strip()
-    
-#     # If it looks like a list
-#     if text.startswith('['):
-#         start = text.find('[')
-#         end = text.rfind(']')
-#         if start != -1 and end != -1: return text[start:end+1]
-#     # If it looks like a single object
-#     else:
-#         start = text.find('{')
-#         end = text.rfind('}')
-#         if start != -1 and end != -1: return text[start:end+1]
-        
-#     return text
-
-# def parse_expense_with_gemini(user_text):
-#     """
-#     Extracts transactions into a JSON LIST. 
-#     Looks for 'save c' to extract context notes.
-#     """
-#     prompt = f"""
-#     You are a Data Extraction API. 
-#     User Input: "{user_text}"
-    
-#     Task: Extract ALL transactions into a JSON LIST.
-    
-#     RULES for 'n' (Note/Context):
-#     - CHECK: Does input contain code "save c" or "context"?
-#     - IF YES: Extract description (e.g. "for dinner", "with team") into field 'n'.
-#     - IF NO: Field 'n' must be empty string "".
-    
-#     RULES for 'c' (Category):
-#     - If user says "Owe", "Payable", "Give [Person]" (Future tense) -> Category is "Debt".
-#     - If user says "Lent", "Given" (Past tense) -> Category is "Loan Given".
-#     - Otherwise -> Normal Category (Food, Travel, etc).
-
-#     RULES for 'a' (Amount):
-#     - POSITIVE (+): Expense, Lending, Debt (Money leaves you).
-#     - NEGATIVE (-): Income, Repayment (Money comes to you).
-    
-#     Output ONLY a JSON LIST:
-#     [
-#       {{"action": "add", "i": "Item", "a": 100, "c": "Category", "n": "note here"}}
-#     ]
-#     """
-#     try:
-#         response = model.generate_content(prompt)
-#         cleaned_text = clean_json_string(response.text)
-#         data = json.loads(cleaned_text)
-        
-#         # Ensure it's always a list
-#         if isinstance(data, dict): data = [data]
-            
-#         # Sanitize Data
-#         for entry in data:
-#             if 'i' in entry: entry['i'] = str(entry['i']).title()
-#             if 'c' in entry: entry['c'] = str(entry['c']).title()
-#             if 'a' in entry: entry['a'] = float(entry['a'])
-#             if 'n' not in entry: entry['n'] = "" # Default to empty note
-            
-#         return data
-#     except Exception as e:
-#         print(f"Parsing Error: {e}")
-#         print(f"Raw Output: {response.text}")
-#         return None
-
-# def add_expense(data):
-#     entry = {
-#         "i": data['i'], 
-#         "a": data['a'], 
-#         "c": data['c'], 
-#         "n": data.get('n', ""), 
-#         "date": datetime.now()
-#     }
-#     collection.insert_one(entry)
-
-# def delete_expense(data):
-#     # Find entry matching amount and similar item name
-#     query = {"a": data['a'], "i": {"$regex": data['i'], "$options": "i"}}
-#     target = collection.find_one(query, sort=[("date", -1)])
-#     if target:
-#         collection.delete_one({"_id": target["_id"]})
-#         return True
-#     return False
-
-# def get_chat_response(query, user_data_context):
-#     prompt = f"""
-#     Context: {user_data_context}
-#     User Question: {query}
-#     Answer concisely. Use emojis. Do not use bold markdown (**).
-#     """
-#     response = model.generate_content(prompt)
-
-#     return response.text
-
-
-
-
-
-
-
-
-
-
-
-
-
+import os
+import google.generativeai as genai
+from pymongo import MongoClient
+from datetime import datetime
+from functools import lru_cache
+import hashlib
+import orjson
+import random
+import re
+import time
+import certifi
+from google.generativeai.types import HarmCategory, HarmBlockThreshold
+
+# --- CONFIGURATION ---
+MONGO_URI = os.getenv("MONGO_URI")
+GEMINI_KEY = os.getenv("GEMINI_KEY")
+
+# --- SETUP (lazy) ---
+# Memoized accessors instead of import-time side effects: importing utils is
+# free, and the TLS/DNS/handshake cost lands on the first caller that actually
+# needs Mongo or Gemini (which in these entry points doubles as the pre-warm).
+
+@lru_cache(maxsize=1)
+def get_cluster():
+    # Expense docs are repetitive (category strings, notes) — wire compression
+    # trades a little CPU for much smaller reads/writes. zstd preferred, zlib
+    # as the always-available fallback.
+    # maxIdleTimeMS below Atlas's idle kill window so the pool recycles
+    # sockets itself instead of surfacing a dead one as a user error
+    cluster = MongoClient(MONGO_URI, tlsCAFile=certifi.where(), maxPoolSize=50, minPoolSize=5, retryWrites=True,
+                          serverSelectionTimeoutMS=5000, maxIdleTimeMS=300000, appname='expense-tracker',
+                          compressors='zstd,zlib', zlibCompressionLevel=3)
+    # Pay the SRV lookup + TLS handshake now, not on the first real query
+    try:
+        cluster.admin.command('ping')
+    except Exception as e:
+        print(f"Mongo Prewarm Skipped: {e}")
+    return cluster
+
+@lru_cache(maxsize=1)
+def get_collection():
+    collection = get_cluster()["expense_tracker"]["expenses"]
+    # Descending date index keeps sort('date', -1).limit(n) a bounded index scan;
+    # the compound index backs delete_expense's amount+item lookup and its sort
+    try:
+        collection.create_index([("date", -1)], background=True)
+        collection.create_index([("a", 1), ("i", 1), ("date", -1)], name="a_i_date_ci", background=True,
+                                collation={'locale': 'en', 'strength': 2})
+    except Exception as e:
+        print(f"Index Setup Skipped: {e}")
+    return collection
+
+@lru_cache(maxsize=1)
+def get_parse_cache():
+    # Persistent completion cache for parsed expenses (entries expire via TTL index)
+    parse_cache = get_cluster()["expense_tracker"]["parse_cache"]
+    try:
+        parse_cache.create_index("ts", expireAfterSeconds=7 * 24 * 3600, background=True)
+    except Exception as e:
+        print(f"Index Setup Skipped: {e}")
+    return parse_cache
+
+# Phrases whose parse depends on DB state or the current date — never cached
+NO_CACHE_RE = re.compile(r'\b(delete|remove|yesterday|today|tomorrow|last|ago)\b', re.I)
+_WS_RE = re.compile(r'\s+')
+
+def normalize_text(user_text):
+    return _WS_RE.sub(' ', user_text.strip().lower())
+
+# --- SAFETY SETTINGS (Disable filters) ---
+safety_config = {
+    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
+}
+
+# Right model for the job: extraction is a classification task the lite tier
+# handles at lower latency/cost; the chat answer keeps the stronger tier.
+PARSE_MODEL_NAME = 'gemini-2.5-flash-lite'
+CHAT_MODEL_NAME = 'gemini-2.5-flash'
+
+@lru_cache(maxsize=2)
+def get_model(name=CHAT_MODEL_NAME):
+    genai.configure(api_key=GEMINI_KEY)
+    return genai.GenerativeModel(name, safety_settings=safety_config)
+
+# --- FUNCTIONS ---
+
+_JSON_RE = re.compile(r'```(?:json)?\s*(\[.*\]|\{.*\})\s*```|(\[.*\]|\{.*\})', re.DOTALL)
+
+def clean_json_string(text):
+    """
+    Robust JSON extractor: one compiled-regex pass that captures the
+    fenced or bare [...] / {...} block.
+    """
+    match = _JSON_RE.search(text)
+    if match:
+        return match.group(1) or match.group(2)
+    return text.strip()
+
+def safe_float_conversion(value):
+    """
+    Handles numbers (50), strings ("50"), and math ("100/2").
+    """
+    try:
+        if isinstance(value, (int, float)): return float(value)
+        if isinstance(value, str):
+            # Clean string to only allow math chars
+            clean_math = re.sub(r'[^0-9\.\/\*\+\-\(\)]', '', value)
+            return float(eval(clean_math))
+    except:
+        return 0.0
+    return 0.0
+
+# Shared rule block for the single and batched parse prompts
+_PARSE_RULES = """
+    STEP 1: IDENTIFY INTENT
+    - Is the user asking a question, asking for a breakdown, or correcting a previous calculation? -> Return { "is_chat": true }
+    - Is the user entering transaction data? -> Extract the data.
+
+    STEP 2: EXTRACT DATA (If transaction)
+    - MATH: Calculate "A/B" immediately (e.g. "100/2" -> 50).
+    - NOTE: Extract context note into 'n' only if user says "save c", "context", or "note".
+
+    STEP 3: CATEGORIZE (STRICT 18 RULES)
+    1. Food: Meals, drinks, snacks, tea, restaurant, meal plans. NOT Outings.
+    2. Groceries: Raw kitchen items, fruits, vegetables, grains, spices.
+    3. Travel: Bus, auto, cab, bike, fuel, train, flight.
+    4. Medical: Doctor, medicine, tests, pharmacy, supplements.
+    5. Subscriptions: Netflix, Spotify, Gym, Cloud, Apps, Prime, Memberships.
+    6. Electronics: Gadgets, phones, chargers, repairs, appliances, headphones.
+    7. Shopping: Clothes, shoes, bags, accessories, watches, wallets.
+    8. Education: Books, courses, exams, stationery, work materials, skill dev.
+    9. Gifts: Birthday treats, gifts for others. NOT Outings.
+    10. Outings: Hangouts, events, festivals (Balijatra), clubs, trips.
+    11. Rent & Utilities: Rent, electricity, water, maintenance.
+    12. Investments: Savings, deposits, mutual funds.
+    13. Entertainment: Movie tickets, games, events (non-outing).
+    14. Personal Care: Soap, shampoo, cosmetics, hygiene.
+    15. Loans/EMI: Repaying loans, EMIs.
+    16. Miscellaneous: Anything else.
+    17. Debt: Future payments ("Owe", "Will pay", "Bill due").
+    18. Loan Given: Past payments to others ("Lent", "Gave").
+
+    Output JSON (Transaction):
+    [ {"action": "add", "i": "Item", "a": 50, "c": "Category", "n": ""} ]
+
+    Output JSON (Chat):
+    { "is_chat": true }
+"""
+
+# Provider-side cache for the static rules prefix: parse calls then send only
+# the per-message text and cached prefix tokens are billed at a fraction.
+# Falls back to inlining the rules if the cache can't be created (older SDK,
+# prefix under the API's minimum cacheable size, offline, ...).
+parse_model = None
+_PREFIX_CACHED = False
+
+def _init_parse_model():
+    global parse_model, _PREFIX_CACHED
+    if parse_model is not None:
+        return
+    parse_model = get_model(PARSE_MODEL_NAME)
+    try:
+        from google.generativeai import caching
+        _cached_rules = caching.CachedContent.create(
+            model=f'models/{PARSE_MODEL_NAME}', system_instruction=_PARSE_RULES, ttl="86400s")
+        parse_model = genai.GenerativeModel.from_cached_content(_cached_rules, safety_settings=safety_config)
+        _PREFIX_CACHED = True
+    except Exception as e:
+        print(f"Context Cache Unavailable: {e}")
+
+# Constant halves of the single-parse prompt — keeps the bytes around the
+# user text identical call-to-call (stable for prefix caching and hashing)
+_PROMPT_PREFIX = '    You are a specialized Data Extractor. User Input: "'
+_PROMPT_SUFFIX = '"\n'
+
+# Structured output: the model emits bare JSON (no ``` fences to strip) and
+# temperature 0 keeps identical inputs yielding identical parses, which is
+# what the exact-match caches assume. No response_schema — the output is a
+# union (entry list or {"is_chat": true}) that a rigid schema can't express.
+# 512 tokens comfortably fits the largest realistic entry list; the cap stops
+# a runaway generation from billing (and streaming) hundreds of extra tokens
+_PARSE_GENERATION_CONFIG = {"response_mime_type": "application/json", "temperature": 0,
+                            "max_output_tokens": 512}
+
+# Hard per-call deadline so a stuck request can't pin a worker thread
+_REQUEST_TIMEOUT = {'timeout': 15}
+
+def _generate_parse(pre, post="", config=_PARSE_GENERATION_CONFIG):
+    """Run a parse prompt, using the cached rules prefix when available."""
+    global parse_model, _PREFIX_CACHED
+    _init_parse_model()
+    if _PREFIX_CACHED:
+        try:
+            return parse_model.generate_content(pre + post, generation_config=config,
+                                                request_options=_REQUEST_TIMEOUT)
+        except Exception as e:
+            print(f"Cached Prefix Failed, falling back: {e}")
+            parse_model = get_model(PARSE_MODEL_NAME)
+            _PREFIX_CACHED = False
+    return get_model(PARSE_MODEL_NAME).generate_content(pre + _PARSE_RULES + post,
+                                                        generation_config=config,
+                                                        request_options=_REQUEST_TIMEOUT)
+
+@lru_cache(maxsize=2048)
+def _title(s):
+    """Title-case with memoization — hot item/category strings repeat a lot,
+    and cache hits return the same canonical string object."""
+    return s.title()
+
+def _sanitize_parse(data):
+    """Validate/normalize one decoded parse result. Returns a list or None."""
+    if isinstance(data, dict) and data.get("is_chat"): return None
+    if isinstance(data, dict): data = [data]
+    if not isinstance(data, list): return None
+
+    valid_data = []
+    for entry in data:
+        # Title Case
+        if 'i' in entry: entry['i'] = _title(str(entry['i']))
+        if 'c' in entry: entry['c'] = _title(str(entry['c']))
+
+        # Robust Math
+        raw_amount = entry.get('a', 0)
+        entry['a'] = safe_float_conversion(raw_amount)
+
+        if entry['a'] == 0: continue
+        if 'n' not in entry: entry['n'] = ""
+        valid_data.append(entry)
+
+    return valid_data if valid_data else None
+
+# Trivial single-item inputs ("bus 30", "100/2 uber", "tea 15 save c with team")
+# don't need an LLM round trip. The fast path only fires when every word of the
+# item maps to a known keyword; anything ambiguous falls through to Gemini.
+_FAST_RE = re.compile(
+    r'^\s*(?:([a-z][a-z ]*?)\s+(\d+(?:\.\d+)?(?:\s*/\s*\d+(?:\.\d+)?)?)'
+    r'|(\d+(?:\.\d+)?(?:\s*/\s*\d+(?:\.\d+)?)?)\s+([a-z][a-z ]*?))'
+    r'(?:\s+(?:save c|context|note)\s+(.+?))?\s*$')
+
+# Keyword -> category map distilled from the prompt's 18 rules
+_KEYWORD_CATEGORIES = {
+    'Food': ('tea', 'coffee', 'lunch', 'dinner', 'breakfast', 'snacks', 'snack', 'meal',
+             'restaurant', 'juice', 'milk', 'biryani', 'pizza', 'burger', 'momos', 'chai'),
+    'Groceries': ('groceries', 'grocery', 'vegetables', 'fruits', 'rice', 'atta', 'spices', 'eggs'),
+    'Travel': ('bus', 'auto', 'cab', 'taxi', 'uber', 'ola', 'rapido', 'bike', 'fuel',
+               'petrol', 'diesel', 'train', 'flight', 'metro'),
+    'Medical': ('doctor', 'medicine', 'medicines', 'pharmacy', 'tests', 'supplements'),
+    'Subscriptions': ('netflix', 'spotify', 'gym', 'prime', 'subscription', 'membership'),
+    'Electronics': ('charger', 'phone', 'headphones', 'earphones', 'mouse', 'keyboard', 'cable'),
+    'Shopping': ('clothes', 'shoes', 'shirt', 'jeans', 'bag', 'watch', 'wallet'),
+    'Education': ('book', 'books', 'course', 'exam', 'stationery', 'pen', 'notebook'),
+    'Rent & Utilities': ('rent', 'electricity', 'water', 'maintenance', 'wifi', 'recharge'),
+    'Entertainment': ('movie', 'game', 'games', 'tickets'),
+    'Personal Care': ('soap', 'shampoo', 'haircut', 'cosmetics', 'toothpaste'),
+}
+_KEYWORD_TO_CATEGORY = {kw: cat for cat, kws in _KEYWORD_CATEGORIES.items() for kw in kws}
+
+@lru_cache(maxsize=1)
+def _learned_categories():
+    """item -> category pairs mined from what is already stored, so the fast
+    path covers this user's actual vocabulary ("mess", "gpay", ...) beyond
+    the hardcoded keywords. One aggregation per process; a miss here still
+    just falls through to Gemini."""
+    try:
+        pipeline = [
+            {"$sort": {"date": -1}},
+            {"$group": {"_id": {"$toLower": "$i"}, "c": {"$first": "$c"}}},
+            {"$limit": 500},
+        ]
+        return {g['_id']: g['c'] for g in get_collection().aggregate(pipeline)
+                if isinstance(g['_id'], str)}
+    except Exception as e:
+        print(f"Category Mining Skipped: {e}")
+        return {}
+
+def _fast_parse(norm_text):
+    """Rule-based parse for unambiguous one-item inputs. Returns a list or None.
+
+    First stage of the parser cascade: zero-latency, zero-token. Only returns
+    a result when the whole item phrase is made of known keywords, so Gemini
+    stays the ground truth for everything else.
+    """
+    match = _FAST_RE.match(norm_text)
+    if not match:
+        return None
+    item = match.group(1) or match.group(4)
+    amount = match.group(2) or match.group(3)
+    note = match.group(5) or ""
+
+    words = item.split()
+    if all(w in _KEYWORD_TO_CATEGORY for w in words):
+        category = _KEYWORD_TO_CATEGORY[words[0]]
+    else:
+        # Whole-phrase match against categories this user already assigned
+        category = _learned_categories().get(item)
+    if category is None:
+        return None
+
+    value = safe_float_conversion(amount)
+    if value == 0:
+        return None
+    return [{"action": "add", "i": _title(item), "a": value, "c": category, "n": note}]
+
+def parse_expense_with_gemini(user_text):
+    norm = normalize_text(user_text)
+    cacheable = not NO_CACHE_RE.search(norm)
+
+    fast = _fast_parse(norm)
+    if fast:
+        return fast
+
+    key = hashlib.sha1(norm.encode()).hexdigest()
+
+    if cacheable:
+        try:
+            hit = get_parse_cache().find_one({"_id": key}, {"data": 1})
+            if hit: return hit["data"]
+        except Exception as e:
+            print(f"Parse Cache Read Failed: {e}")
+
+    try:
+        response = _generate_parse(_PROMPT_PREFIX + user_text + _PROMPT_SUFFIX)
+        cleaned_text = clean_json_string(response.text)
+        result = _sanitize_parse(orjson.loads(cleaned_text))
+
+    except Exception as e:
+        print(f"Parsing Logic Error: {e}")
+        return None
+
+    if cacheable and result:
+        try:
+            get_parse_cache().replace_one({"_id": key}, {"data": result, "ts": datetime.now()}, upsert=True)
+        except Exception as e:
+            print(f"Parse Cache Write Failed: {e}")
+    return result
+
+def parse_expenses_batch(texts):
+    """Parse several user messages with one Gemini call (micro-batching)."""
+    # Peel off the trivial inputs first; only the rest go to the model
+    parsed = [_fast_parse(normalize_text(t)) for t in texts]
+    pending = [idx for idx, p in enumerate(parsed) if p is None]
+    if not pending:
+        return parsed
+    if len(pending) == 1:
+        parsed[pending[0]] = parse_expense_with_gemini(texts[pending[0]])
+        return parsed
+
+    numbered = "\n".join(f'    {idx}: "{texts[idx]}"' for idx in pending)
+    try:
+        # Scale the output cap with batch size: the single-parse 512 would
+        # truncate a full batch, and a truncated response fails the loads
+        # below and degrades into per-message calls — exactly under load
+        batch_config = {**_PARSE_GENERATION_CONFIG, "max_output_tokens": 512 * len(pending)}
+        response = _generate_parse(
+            "    You are a specialized Data Extractor. Parse EACH numbered input independently.\n"
+            "    Inputs:\n" + numbered + "\n",
+            '\n    Final Output: ONE JSON object keyed by input number, e.g. {"0": [...], "1": {"is_chat": true}}\n',
+            config=batch_config
+        )
+        text = response.text.replace('```json', '').replace('```', '').strip()
+        results = orjson.loads(text[text.find('{'):text.rfind('}') + 1])
+        for idx in pending:
+            parsed[idx] = _sanitize_parse(results.get(str(idx)))
+        return parsed
+    except Exception as e:
+        print(f"Batch Parsing Error: {e}")
+        # Degrade to individual calls rather than dropping the whole batch
+        for idx in pending:
+            parsed[idx] = parse_expense_with_gemini(texts[idx])
+        return parsed
+
+def add_expense(data):
+    """Single-entry convenience wrapper over the batched path."""
+    bulk_add_expenses([data])
+
+def bulk_add_expenses(items):
+    """One insert_many round-trip for a whole parsed batch. Returns the stamped docs."""
+    now = datetime.now()
+    docs = [{"i": d['i'], "a": d['a'], "c": d['c'], "n": d.get('n', ""), "date": now} for d in items]
+    if docs:
+        get_collection().insert_many(docs, ordered=False)
+    return docs
+
+def delete_expense(data):
+    # Case-insensitive equality via collation: index-friendly, and immune to
+    # regex metacharacters in item names (a "." item would match everything).
+    # No hint — the planner picks the collation index when it exists, and a
+    # hint would hard-fail every delete if index creation was ever skipped.
+    query = {"a": data['a'], "i": data['i']}
+    target = get_collection().find_one_and_delete(query, sort=[("date", -1)], projection={"i": 1, "date": 1},
+                                            collation={'locale': 'en', 'strength': 2})
+    if target:
+        return True, target['i'], target['date']
+    return False, None, None
+
+def bulk_delete_expenses(items):
+    """Delete the newest match for each (amount, item) pair in two round trips.
+
+    One aggregation picks the newest matching doc per pair, one delete_many
+    removes them — versus two round trips per item with delete_expense.
+    Returns (success, item, date) tuples aligned with `items`.
+    """
+    if len(items) == 1:
+        return [delete_expense(items[0])]
+
+    # Duplicate pairs ("tea 10 tea 10 delete") would collapse into one $group
+    # bucket and over-report deletions — take them one at a time instead
+    pairs = [(d['a'], d['i'].lower()) for d in items]
+    if len(set(pairs)) != len(pairs):
+        return [delete_expense(d) for d in items]
+
+    pipeline = [
+        {"$match": {"$or": [{"a": d['a'], "i": d['i']} for d in items]}},
+        {"$sort": {"date": -1}},
+        {"$group": {"_id": {"a": "$a", "i": {"$toLower": "$i"}},
+                    "doc_id": {"$first": "$_id"}, "i": {"$first": "$i"}, "date": {"$first": "$date"}}},
+    ]
+    found = {}
+    for g in get_collection().aggregate(pipeline, collation={'locale': 'en', 'strength': 2}):
+        found[(g['_id']['a'], g['_id']['i'])] = g
+    if found:
+        get_collection().delete_many({"_id": {"$in": [g['doc_id'] for g in found.values()]}})
+
+    results = []
+    for d in items:
+        g = found.get((d['a'], d['i'].lower()))
+        results.append((True, g['i'], g['date']) if g else (False, None, None))
+    return results
+
+CHAT_FAILURE = "⚠️ Google AI is currently overloaded or blocking this request. Please try again in 1 minute."
+
+# Formatted once per day, not per request — also keeps the prompt bytes
+# identical within a day, which any prompt-level caching depends on
+_TODAY_CACHE = [None, None]
+
+def _today_str():
+    day = datetime.now().date()
+    if _TODAY_CACHE[0] != day:
+        _TODAY_CACHE[0] = day
+        _TODAY_CACHE[1] = day.isoformat()
+    return _TODAY_CACHE[1]
+
+def _chat_prompt(query, user_data_context):
+    today_str = _today_str()
+    return f"""
+    You are a Financial Analyst. Today: {today_str}
+    User Question: {query}
+    Data: {user_data_context}
+
+    RULES:
+    1. Filter data by date relative to today.
+    2. Sum items accurately.
+    3. Use Markdown (**bold**). NO HTML.
+    """
+
+# Chat answers are short Markdown summaries; generation time scales with
+# output tokens, so the cap bounds both latency and cost
+_CHAT_GENERATION_CONFIG = {"temperature": 0.3, "max_output_tokens": 512}
+
+def get_chat_response(query, user_data_context):
+    prompt = _chat_prompt(query, user_data_context)
+
+    for attempt in range(3):
+        try:
+            response = get_model().generate_content(prompt, generation_config=_CHAT_GENERATION_CONFIG,
+                                                    request_options=_REQUEST_TIMEOUT)
+            return response.text
+        except Exception as e:
+            print(f"Chat Attempt {attempt+1} Failed: {e}")
+            # Jittered exponential backoff: quick first retry, bounded total wait
+            time.sleep(min(0.2 * 2 ** attempt + random.random() * 0.1, 2.0))
+
+    return CHAT_FAILURE
+
+def stream_chat_response(query, user_data_context):
+    """Generator variant for UIs that can render tokens as they arrive."""
+    try:
+        for chunk in get_model().generate_content(_chat_prompt(query, user_data_context), stream=True,
+                                                  generation_config=_CHAT_GENERATION_CONFIG,
+                                                  request_options=_REQUEST_TIMEOUT):
+            if chunk.text: yield chunk.text
+    except Exception as e:
+        print(f"Chat Stream Failed: {e}")
+        yield CHAT_FAILURE
+
+def prewarm_backends():
+    """Touch Mongo and Gemini once so the first user request after a cold
+    start doesn't pay SRV/TLS/auth setup. Blocking — run it off the main
+    thread. Init stays lazy for callers that never get here."""
+    get_collection()
+    try:
+        # One throwaway token opens and authenticates the HTTP transport
+        get_model().generate_content("ping", generation_config={"max_output_tokens": 1},
+                                     request_options=_REQUEST_TIMEOUT)
+    except Exception as e:
+        print(f"Gemini Prewarm Skipped: {e}")